@@ -1,13 +1,10 @@
 import math
 from utils.utils import text_to_vector
 # https://bergvca.github.io/2017/10/14/super-fast-string-matching.html
-import re
-from sklearn.feature_extraction.text import TfidfVectorizer
 import numpy as np
 import pandas as pd
 from scipy.sparse import csr_matrix
 import sparse_dot_topn.sparse_dot_topn as ct
-from utils.utils import ngrams
 
 
 def get_cosine(string1, string2):
@@ -45,8 +42,64 @@ def get_top_similarity_indices(reference,terms_list,threshold=0.8):
 
 
 
-def get_tfidf_matrix(l):
-    vectorizer = TfidfVectorizer(min_df=1, analyzer=ngrams, use_idf=False)
+class NgramHashingVectorizer:
+    """
+    Character n-gram featurizer equivalent to a TfidfVectorizer using utils.utils.ngrams as analyzer
+    with use_idf=False (raw n-gram counts, L2-normalized rows), built directly with NumPy over code points.
+
+    Each n-gram is mapped to a fixed column by packing its code points (n_bits bits each), so there is
+    no vocabulary to fit and names featurized in separate batches share the same feature space.
+    N-grams made only of code points below 2**n_bits never collide.
+
+    :param n: The n-gram size.
+    :type n: int.
+    :param n_bits: The number of bits kept for each code point.
+    :type n_bits: int.
+    """
+
+    # characters removed by utils.utils.ngrams before building n-grams: ',', '-', '.', '/'
+    STRIPPED_RANGE = (ord(","), ord("/"))
+
+    def __init__(self, n=2, n_bits=11):
+        if n < 1 or n_bits < 1 or n * n_bits > 31:
+            raise ValueError("n * n_bits must be between 1 and 31, got n={} and n_bits={}".format(n, n_bits))
+        self.n = n
+        self.n_bits = n_bits
+        self.n_features = 1 << (n * n_bits)
+
+    def transform(self, l):
+        lengths = np.fromiter(map(len, l), dtype=np.int64, count=len(l))
+        code_points = np.frombuffer("".join(l).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        rows = np.repeat(np.arange(len(l), dtype=np.int64), lengths)
+
+        low, high = self.STRIPPED_RANGE
+        keep = (code_points < low) | (code_points > high)
+        code_points = code_points[keep].astype(np.int64) & ((1 << self.n_bits) - 1)
+        rows = rows[keep]
+
+        # an n-gram starts at every position whose last code point still belongs to the same name
+        nb_ngrams = max(code_points.size - self.n + 1, 0)
+        valid = rows[:nb_ngrams] == rows[self.n - 1:]
+        columns = np.zeros(nb_ngrams, dtype=np.int64)
+        for k in range(self.n):
+            columns = (columns << self.n_bits) | code_points[k:k + nb_ngrams]
+        rows = rows[:nb_ngrams][valid]
+        columns = columns[valid].astype(np.int32)
+
+        matrix = csr_matrix((np.ones(rows.size), (rows, columns)), shape=(len(l), self.n_features))
+        matrix.sum_duplicates()
+        data_rows = np.repeat(np.arange(len(l)), np.diff(matrix.indptr))
+        norms = np.sqrt(np.bincount(data_rows, weights=matrix.data ** 2, minlength=len(l)))
+        matrix.data /= norms[data_rows]
+        return matrix
+
+    def fit_transform(self, l):
+        return self.transform(l)
+
+
+def get_tfidf_matrix(l, vectorizer=None):
+    if vectorizer is None:
+        vectorizer = NgramHashingVectorizer()
     return vectorizer.fit_transform(l)
 
 